@@ -1,74 +1,154 @@
 import sys
 import os
+import re
+import functools
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import OrderedDict
+from types import MappingProxyType
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
-                             QHBoxLayout, QTabWidget, QTableWidget, QTableWidgetItem,
+                             QHBoxLayout, QTabWidget, QTableView,
                              QPushButton, QLabel, QComboBox, QFileDialog, QMessageBox,
-                             QHeaderView, QFrame, QSplitter, QProgressBar, QStatusBar)
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer
-from PyQt5.QtGui import QFont, QColor, QPalette, QIcon
+                             QHeaderView, QFrame, QProgressBar, QStatusBar,
+                             QStyle, QStyleOptionHeader)
+from PyQt5.QtCore import Qt, QThread, pyqtSignal, QAbstractTableModel, QModelIndex
+from PyQt5.QtGui import QFont, QColor, QPalette
+import numpy as np
 import pandas as pd
-from transaction_processor import TransactionProcessor
-from datetime import datetime
+from transaction_processor import TransactionProcessor, process_transactions
+try:
+    import xlsxwriter
+except ImportError:  # Export falls back to openpyxl's write-only mode
+    xlsxwriter = None
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Workbooks are then always read directly, without a side-car cache
+    pa = pq = None
 import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils.dataframe import dataframe_to_rows
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl.utils import get_column_letter
 
 DATA_FILE = 'Test_transactions.xlsx'
 
+# Input columns that hold labels rather than numbers or dates
+TEXT_COLUMNS = ['Portfolio', 'Parent company', 'Legal entity', 'Custodian', 'Account',
+                'Security', 'Currency', 'B/S']
+
+# Parquet side-car schema metadata key holding the source workbook's "mtime_ns:size";
+# the side-car is only used when this matches the workbook exactly
+_SOURCE_SIGNATURE_KEY = b'source_signature'
+
+# Most recently read workbook as [(path, mtime_ns, size), DataFrame]; frames are
+# treated as read-only once loaded (processing works on its own copy)
+_loaded_workbook = [None, None]
+
+# Number of holdings snapshots kept for quick level/date switching
+HOLDINGS_CACHE_SIZE = 32
+
+# Rows formatted together when the table view first paints part of a column
+DISPLAY_BLOCK_ROWS = 512
+
+# Excel export header style, shared read-only by every export. xlsxwriter
+# formats belong to one workbook, so only the properties can be shared.
+HEADER_FORMAT = MappingProxyType({
+    'bold': True,
+    'font_color': '#FFFFFF',
+    'bg_color': '#2C3E50',
+    'align': 'center',
+    'valign': 'vcenter',
+    'text_wrap': True,
+})
+# Same header style for the openpyxl fallback (styles are immutable; colors are ARGB)
+OPENPYXL_HEADER_FONT = Font(bold=True, color="FFFFFFFF")
+OPENPYXL_HEADER_FILL = PatternFill(start_color="FF2C3E50", end_color="FF2C3E50", fill_type="solid")
+OPENPYXL_HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="center", wrap_text=True)
+
+# Calculated fields produced for every consolidation level
+_LEVEL_FIELDS = (
+    "Transaction Cost USD", "Transaction Cost CCY", "Cumulative Quantity",
+    "Cumulative Cost CCY", "Cumulative Cost USD", "Cost per Unit USD",
+    "Cost per Unit CCY", "Realized Gain/Loss CCY", "Realized Gain/Loss USD",
+)
+
 # Column grouping metadata for header styling
 COLUMN_GROUPS = [
-    {
-        "section": "Portfolio",
-        "color": QColor(203, 231, 250),  # Light blue
-        "fields": [
-            "Transaction Cost USD", "Transaction Cost CCY", "Cumulative Quantity",
-            "Cumulative Cost CCY", "Cumulative Cost USD", "Cost per Unit USD",
-            "Cost per Unit CCY", "Realized Gain/Loss CCY", "Realized Gain/Loss USD",
-        ],
-    },
-    {
-        "section": "Parent company",
-        "color": QColor(248, 214, 234),  # Light pink
-        "fields": [
-            "Transaction Cost USD", "Transaction Cost CCY", "Cumulative Quantity",
-            "Cumulative Cost CCY", "Cumulative Cost USD", "Cost per Unit USD",
-            "Cost per Unit CCY", "Realized Gain/Loss CCY", "Realized Gain/Loss USD",
-        ],
-    },
-    {
-        "section": "Legal entity",
-        "color": QColor(255, 253, 231),  # Light yellow
-        "fields": [
-            "Transaction Cost USD", "Transaction Cost CCY", "Cumulative Quantity",
-            "Cumulative Cost CCY", "Cumulative Cost USD", "Cost per Unit USD",
-            "Cost per Unit CCY", "Realized Gain/Loss CCY", "Realized Gain/Loss USD",
-        ],
-    },
-    {
-        "section": "Account",
-        "color": QColor(232, 245, 232),  # Light green
-        "fields": [
-            "Transaction Cost USD", "Transaction Cost CCY", "Cumulative Quantity",
-            "Cumulative Cost CCY", "Cumulative Cost USD", "Cost per Unit USD",
-            "Cost per Unit CCY", "Realized Gain/Loss CCY", "Realized Gain/Loss USD",
-        ],
-    },
+    {"section": "Portfolio", "color": QColor(203, 231, 250), "fields": _LEVEL_FIELDS},  # Light blue
+    {"section": "Parent company", "color": QColor(248, 214, 234), "fields": _LEVEL_FIELDS},  # Light pink
+    {"section": "Legal entity", "color": QColor(255, 253, 231), "fields": _LEVEL_FIELDS},  # Light yellow
+    {"section": "Account", "color": QColor(232, 245, 232), "fields": _LEVEL_FIELDS},  # Light green
 ]
 
+# Column-name keyword patterns for widths, alignment and number formatting
+_WIDE_AMOUNT_RE = re.compile(r'Cost|Price|Total|Rate|Gain/Loss')
+_RIGHT_ALIGN_RE = re.compile(r'Cost|Quantity|Price|Total|Gain/Loss|WAC')
+_HOLDINGS_USD_RE = re.compile(r'Cost USD|WAC USD')
+_HOLDINGS_CCY_RE = re.compile(r'Cost CCY|WAC CCY')
+_HOLDINGS_AMOUNT_RE = re.compile(r'Quantity|Cost|WAC|Value')
+_HOLDINGS_RIGHT_ALIGN_RE = re.compile(r'Quantity|Cost|WAC')
+
 LEVELS = [grp["section"] for grp in COLUMN_GROUPS]
-LEVEL_COLORS = {grp["section"]: grp["color"] for grp in COLUMN_GROUPS}
 
+_SUFFIX_TO_LEVEL = {f"({level})": level for level in LEVELS}
+
+@functools.lru_cache(maxsize=None)
 def get_column_level(col: str) -> str | None:
     """Get the consolidation level for a column"""
-    for level in LEVELS:
-        if f"({level})" in col:
-            return level
-    return None
+    # Calculated columns end in "(<level>)"; look that suffix up directly
+    return _SUFFIX_TO_LEVEL.get(col[col.rfind('('):]) if col.endswith(')') else None
+
+def read_transactions(file_path: str) -> pd.DataFrame:
+    """Read a transactions workbook, reusing a parquet side-car cache when fresh"""
+    # Reloading an unchanged file in the same session reuses the frame already read
+    stat = os.stat(file_path)
+    key = (os.path.realpath(file_path), stat.st_mtime_ns, stat.st_size)
+    if _loaded_workbook[0] == key:
+        return _loaded_workbook[1]
+    
+    df = _read_transactions_uncached(file_path)
+    _loaded_workbook[:] = [key, df]
+    return df
+
+def _read_transactions_uncached(file_path: str) -> pd.DataFrame:
+    """Read a transactions workbook via its parquet side-car or the workbook itself"""
+    cache_path = file_path + '.parquet'
+    stat = os.stat(file_path)
+    signature = f'{stat.st_mtime_ns}:{stat.st_size}'.encode()
+    if pq is not None and os.path.exists(cache_path):
+        try:
+            # A workbook replaced by a different (even older-dated) file no longer matches
+            if (pq.read_schema(cache_path).metadata or {}).get(_SOURCE_SIGNATURE_KEY) == signature:
+                return pd.read_parquet(cache_path)
+        except Exception:
+            pass  # Unreadable side-car; fall back to the workbook and rewrite it
+    
+    # Label columns are read as text so pandas does not re-infer them (e.g. numeric account codes)
+    dtypes = {col: str for col in TEXT_COLUMNS}
+    try:
+        # Rust-backed reader, much faster than openpyxl (pandas >= 2.2)
+        workbook = pd.ExcelFile(file_path, engine='calamine')
+    except (ImportError, ValueError):
+        workbook = pd.ExcelFile(file_path)
+    # The container is opened once and only the first sheet is parsed from it
+    with workbook:
+        df = workbook.parse(workbook.sheet_names[0], dtype=dtypes)
+    
+    if pq is not None:
+        try:
+            table = pa.Table.from_pandas(df)
+            metadata = {**(table.schema.metadata or {}), _SOURCE_SIGNATURE_KEY: signature}
+            pq.write_table(table.replace_schema_metadata(metadata), cache_path, compression='zstd')
+        except Exception:
+            pass  # Caching is best effort (read-only folder, mixed types)
+    return df
 
 def load_sample_data():
     """Load sample data from Excel file"""
     if os.path.exists(DATA_FILE):
-        return pd.read_excel(DATA_FILE)
+        return read_transactions(DATA_FILE)
     else:
         # Create sample data if file doesn't exist
         return create_sample_data()
@@ -95,25 +175,302 @@ def create_sample_data():
     }
     return pd.DataFrame(data)
 
+def export_column_widths(data: pd.DataFrame) -> list:
+    """Excel column widths fitted to the longest rendered value or header"""
+    widths = []
+    # Columns are measured one at a time so the whole frame is never held as strings at once
+    for col in data.columns:
+        max_length = len(str(col))
+        if not data.empty:
+            values = data[col]
+            if pd.api.types.is_datetime64_any_dtype(values):
+                # Dates are written as 'yyyy-mm-dd hh:mm:ss', even when every time is midnight
+                values = values.dt.strftime('%Y-%m-%d %H:%M:%S').fillna('')
+            max_length = max(max_length, int(values.astype(str).str.len().max()))
+        widths.append(min(max_length + 2, 50))
+    return widths
+
+def iter_export_rows(data: pd.DataFrame):
+    """Yield export rows as tuples, with missing values as None (empty cells)"""
+    column_values = []
+    for col in data.columns:
+        values = data[col]
+        if values.hasnans:
+            values = values.astype(object).where(values.notna(), None)
+        column_values.append(values.to_numpy(dtype=object))
+    return zip(*column_values)
+
+def wrap_header(field: str, section: str) -> str:
+    """Split a calculated column name over several header lines"""
+    if len(field) > 10:
+        words = field.split(' ')
+        if len(words) > 1:
+            if len(words) >= 3:
+                mid = len(words) // 2
+                return f"{' '.join(words[:mid])}\n{' '.join(words[mid:])}\n({section})"
+            return f"{words[0]}\n{words[1]}\n({section})"
+        if len(field) > 15:
+            mid = len(field) // 2
+            return f"{field[:mid]}\n{field[mid:]}\n({section})"
+    return f"{field}\n({section})"
+
+# (column name, multi-line header, header color) for every calculated column
+_GENERATED_COLUMNS = [
+    (f"{field} ({group['section']})", wrap_header(field, group['section']), group["color"])
+    for group in COLUMN_GROUPS
+    for field in group["fields"]
+]
+
+# Realized gain/loss columns, which display blank rather than 0.00 on non-sell rows
+_RGL_COLUMNS = frozenset(col for col, _, _ in _GENERATED_COLUMNS if 'Realized Gain/Loss' in col)
+
 class DataProcessorThread(QThread):
-    """Thread for processing data to avoid UI freezing"""
-    finished = pyqtSignal(pd.DataFrame)
+    """Reusable thread for processing data to avoid UI freezing"""
+    # The DataFrame is left on `result` for the GUI thread instead of riding the signal
+    processed = pyqtSignal()
     error = pyqtSignal(str)
     
-    def __init__(self, data, processor):
-        super().__init__()
-        self.data = data
+    def __init__(self, processor, parent=None):
+        super().__init__(parent)
         self.processor = processor
+        self.result = None
+        self._pending = None
+        self._busy = False
+        self._lock = threading.Lock()
+        self._pool = None
+    
+    def process(self, data):
+        """Queue data for processing, starting the thread if it is idle"""
+        with self._lock:
+            self._pending = data
+            if self._busy:
+                # The running loop picks up the newest data when it finishes
+                return
+            self._busy = True
+        # A previous run() may still be returning after clearing _busy
+        self.wait()
+        self.start()
+    
+    def shutdown(self):
+        """Stop the worker process and wait for any processing in flight"""
+        with self._lock:
+            self._pending = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self.wait()
+    
+    def run(self):
+        while True:
+            with self._lock:
+                data, self._pending = self._pending, None
+                if data is None:
+                    self._busy = False
+                    return
+            try:
+                self.result = shrink_dtypes(self._process(data))
+                self.processed.emit()
+            except Exception as e:
+                self.error.emit(str(e))
+    
+    def _process(self, data):
+        """Process data in the worker process so the GUI thread keeps the GIL"""
+        if self._pool is None:
+            # Spawned (not forked) so the worker never inherits Qt state
+            self._pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+        try:
+            return self._pool.submit(process_transactions, data).result()
+        except BrokenProcessPool:
+            # Worker could not start or died; process in this thread instead
+            self._pool = None
+            return self.processor.process_transactions(data)
+
+class BackgroundTask(QThread):
+    """One-shot thread for blocking file I/O so the GUI thread keeps painting"""
+    done = pyqtSignal(object)
+    error = pyqtSignal(str)
+    
+    def __init__(self, func, *args, parent=None):
+        super().__init__(parent)
+        self._func = func
+        self._args = args
     
     def run(self):
         try:
-            processed_data = self.processor.process_transactions(self.data)
-            self.finished.emit(processed_data)
+            self.done.emit(self._func(*self._args))
         except Exception as e:
             self.error.emit(str(e))
 
-class CustomTableWidget(QTableWidget):
-    """Custom table widget with enhanced styling and functionality"""
+def shrink_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Downcast numeric columns and intern repeated label columns in place"""
+    for col in df.columns:
+        values = df[col]
+        if col in TEXT_COLUMNS:
+            # Labels repeat heavily; a categorical keeps one string per distinct value
+            if values.nunique() < 0.5 * len(values):
+                df[col] = values.astype('category')
+        elif values.dtype == np.int64:
+            df[col] = pd.to_numeric(values, downcast='integer')
+        elif values.dtype == np.float64:
+            # Amounts are shown to the cent, so only exactly representable columns narrow
+            narrow = values.to_numpy().astype(np.float32)
+            if np.array_equal(narrow, values.to_numpy(), equal_nan=True):
+                df[col] = narrow
+    return df
+
+def format_amounts(values: pd.Series) -> pd.Series:
+    """Format a numeric column with thousands separators and 2 decimals"""
+    values = pd.to_numeric(values, errors='coerce')
+    # Each distinct value is formatted once; missing values (code -1) take the last label.
+    # factorize treats -0.0 and 0.0 as one value, so zeros are factorized as +0.0 and
+    # negative zeros are then pointed at their own label.
+    codes, uniques = pd.factorize(values + 0.0)
+    labels = np.array([f"{value:,.2f}" for value in uniques] + ['-0.00', '0.00'], dtype=object)
+    array = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    negative_zero = (array == 0) & np.signbit(array)
+    if negative_zero.any():
+        codes[negative_zero] = len(uniques)
+    return pd.Series(labels[codes], index=values.index)
+
+def format_rgl(values: pd.Series) -> pd.Series:
+    """Format a realized gain/loss column, leaving non-sell rows blank"""
+    values = pd.to_numeric(values, errors='coerce')
+    codes, uniques = pd.factorize(values)
+    labels = np.array([f"{value:,.2f}" if value != 0 else '' for value in uniques] + [''], dtype=object)
+    return pd.Series(labels[codes], index=values.index)
+
+def format_text(values: pd.Series) -> pd.Series:
+    """Render a non-numeric column as plain text, sharing one string per distinct value"""
+    # Identifier columns repeat a handful of values, so each distinct value is
+    # converted once and every row points at the same str object. Missing
+    # values (code -1) take the trailing blank label, matching the export's empty cells.
+    codes, uniques = pd.factorize(values)
+    labels = np.array([str(value) for value in uniques] + [''], dtype=object)
+    return pd.Series(labels[codes], index=values.index)
+
+class DataFrameModel(QAbstractTableModel):
+    """Read-only table model that formats DataFrame cells on demand"""
+    
+    def __init__(self, df=None, columns=None, headers=None, colors=None,
+                 alignments=None, formatters=None, parent=None):
+        super().__init__(parent)
+        self._df = df if df is not None else pd.DataFrame()
+        self._columns = list(columns) if columns is not None else list(self._df.columns)
+        # Positions into the backing frame so no column subset is copied
+        self._positions = self._df.columns.get_indexer(self._columns)
+        self._headers = list(headers) if headers is not None else [str(c) for c in self._columns]
+        self._colors = list(colors) if colors is not None else []
+        default_alignment = int(Qt.AlignLeft | Qt.AlignVCenter)
+        self._alignments = list(alignments) if alignments is not None else [default_alignment] * len(self._columns)
+        self._formatters = list(formatters) if formatters is not None else [format_text] * len(self._columns)
+        # Display text per (column, row block), formatted only once a block scrolls into view
+        self._display = {}
+        # Row permutation used for sorting; the frame itself is never reordered
+        self._index = np.arange(len(self._df))
+        # Row permutations already computed, keyed by (column, order)
+        self._orders = {}
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._index)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._columns)
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        col = index.column()
+        if role == Qt.DisplayRole:
+            block, offset = divmod(index.row(), DISPLAY_BLOCK_ROWS)
+            text = self._display.get((col, block))
+            if text is None:
+                start = block * DISPLAY_BLOCK_ROWS
+                rows = self._index[start:start + DISPLAY_BLOCK_ROWS]
+                values = self._df.iloc[rows, self._positions[col]]
+                text = self._formatters[col](values).to_numpy()
+                self._display[(col, block)] = text
+            return text[offset]
+        if role == Qt.TextAlignmentRole:
+            return self._alignments[col]
+        return None
+    
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation != Qt.Horizontal:
+            return None
+        if role == Qt.DisplayRole:
+            return self._headers[section]
+        if role == Qt.BackgroundRole and section < len(self._colors):
+            return self._colors[section]
+        return None
+    
+    def sort(self, column, order=Qt.AscendingOrder):
+        """Sort rows by a column using a vectorised argsort, reusing earlier orderings"""
+        if column < 0 or self._df.empty:
+            return
+        key = (column, order)
+        rows = self._orders.get(key)
+        if rows is None:
+            # Re-wrap the column's backing array on a fresh positional index (no copy)
+            values = pd.Series(self._df.iloc[:, self._positions[column]].array, copy=False)
+            try:
+                ordered = values.sort_values(ascending=order == Qt.AscendingOrder,
+                                             kind='stable', na_position='last')
+            except TypeError:
+                # Mixed-type object columns: values are parsed as numbers once, so numeric
+                # cells order by value and the rest follow, ordered as text; blank cells
+                # always go last, whichever the direction
+                ascending = order == Qt.AscendingOrder
+                keys = pd.DataFrame({'missing': values.isna(),
+                                     'number': pd.to_numeric(values, errors='coerce'),
+                                     'text': values.astype(str)})
+                ordered = keys.sort_values(['missing', 'number', 'text'],
+                                           ascending=[True, ascending, ascending],
+                                           kind='stable', na_position='last')
+            rows = ordered.index.to_numpy()
+            self._orders[key] = rows
+        self.layoutAboutToBeChanged.emit()
+        self._index = rows
+        # Blocks follow display order, so formatted text is rebuilt lazily after a sort
+        self._display.clear()
+        self.layoutChanged.emit()
+
+class ColoredHeader(QHeaderView):
+    """Horizontal header that fills each section with its model background color"""
+    
+    def __init__(self, parent=None):
+        super().__init__(Qt.Horizontal, parent)
+    
+    def paintSection(self, painter, rect, logicalIndex):
+        model = self.model()
+        color = model.headerData(logicalIndex, Qt.Horizontal, Qt.BackgroundRole) if model else None
+        if color is None:
+            super().paintSection(painter, rect, logicalIndex)
+            return
+        
+        # Paint the fill ourselves so the color shows regardless of the native style
+        painter.save()
+        painter.fillRect(rect, color)
+        painter.setPen(self.palette().color(QPalette.Mid))
+        painter.drawLine(rect.topRight(), rect.bottomRight())
+        painter.drawLine(rect.bottomLeft(), rect.bottomRight())
+        
+        opt = QStyleOptionHeader()
+        self.initStyleOption(opt)
+        opt.rect = rect
+        opt.section = logicalIndex
+        opt.text = model.headerData(logicalIndex, Qt.Horizontal, Qt.DisplayRole) or ''
+        opt.textAlignment = self.defaultAlignment()
+        if self.isSortIndicatorShown() and self.sortIndicatorSection() == logicalIndex:
+            opt.sortIndicator = (QStyleOptionHeader.SortDown
+                                 if self.sortIndicatorOrder() == Qt.AscendingOrder
+                                 else QStyleOptionHeader.SortUp)
+        self.style().drawControl(QStyle.CE_HeaderLabel, opt, painter, self)
+        if opt.sortIndicator != QStyleOptionHeader.None_:
+            opt.rect = self.style().subElementRect(QStyle.SE_HeaderArrow, opt, self)
+            self.style().drawPrimitive(QStyle.PE_IndicatorHeaderArrow, opt, painter, self)
+        painter.restore()
+
+class CustomTableView(QTableView):
+    """Custom table view with enhanced styling and functionality"""
     
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -123,10 +480,11 @@ class CustomTableWidget(QTableWidget):
         """Setup table appearance and behavior"""
         # Set table properties
         self.setAlternatingRowColors(True)
-        self.setSelectionBehavior(QTableWidget.SelectRows)
+        self.setSelectionBehavior(QTableView.SelectRows)
         self.setSortingEnabled(True)
         
-        # Configure header
+        # Configure header; section colors are painted from the model
+        self.setHorizontalHeader(ColoredHeader(self))
         header = self.horizontalHeader()
         header.setStretchLastSection(False)
         header.setSectionsClickable(True)
@@ -139,8 +497,12 @@ class CustomTableWidget(QTableWidget):
         vheader = self.verticalHeader()
         vheader.setVisible(False)
         
-        # Set row height
+        # Set row height; fixed rows let the view map scroll offsets to rows arithmetically
         self.verticalHeader().setDefaultSectionSize(30)
+        vheader.setSectionResizeMode(QHeaderView.Fixed)
+        
+        # Cells are single-line values, so skip word-wrap text layout when painting
+        self.setWordWrap(False)
         
         # Set font
         font = QFont("Arial", 10)
@@ -149,19 +511,44 @@ class CustomTableWidget(QTableWidget):
         # Set header font
         header_font = QFont("Arial", 10, QFont.Bold)
         header.setFont(header_font)
+        
+        # Start with an empty model so widths/headers can be queried safely
+        self.setModel(DataFrameModel())
     
-    def set_header_colors(self, column_colors):
-        """Set header background colors for different consolidation levels"""
+    def set_column_widths(self, widths):
+        """Resize all columns in one batch with repaints suspended"""
         header = self.horizontalHeader()
-        for col, color in enumerate(column_colors):
-            if col < self.columnCount():
-                # Create a palette with the desired background color
-                palette = header.palette()
-                palette.setColor(QPalette.Button, color)
-                header.setPalette(palette)
-                
-                # Force header update
-                header.updateSection(col)
+        updates_enabled = self.updatesEnabled()
+        self.setUpdatesEnabled(False)
+        try:
+            for i, width in enumerate(widths):
+                header.resizeSection(i, width)
+        finally:
+            self.setUpdatesEnabled(updates_enabled)
+    
+    def show_model(self, model, widths=()):
+        """Install a model and its column widths with repaints suspended, so they land in one paint"""
+        self.setUpdatesEnabled(False)
+        try:
+            self.setModel(model)
+            self.set_column_widths(widths)
+        finally:
+            self.setUpdatesEnabled(True)
+    
+    def setModel(self, model):
+        """Install a new model and release the one it replaces"""
+        old_model = self.model()
+        super().setModel(model)
+        # Keep rows in the order the header's sort arrow shows, as a sorting table widget would
+        if model is not None and self.isSortingEnabled():
+            header = self.horizontalHeader()
+            section = header.sortIndicatorSection()
+            if 0 <= section < model.columnCount():
+                model.sort(section, header.sortIndicatorOrder())
+            else:
+                header.setSortIndicator(-1, Qt.AscendingOrder)
+        if old_model is not None and old_model is not model:
+            old_model.deleteLater()
 
 class PortfolioReportingApp(QMainWindow):
     """Main portfolio reporting application"""
@@ -171,7 +558,20 @@ class PortfolioReportingApp(QMainWindow):
         self.processor = TransactionProcessor()
         self.data = None
         self.processed_data = None
+        self._main_cols = []
+        self._trade_date_strings = []
+        # Column layouts are static per column set / level, so build them once; the activity
+        # layout keeps only the latest (schema, layout) pair, as loads replace the schema
+        self._header_cache = (None, None)
+        self._holdings_layouts = self.build_holdings_layouts()
+        self._holdings_cache = OrderedDict()
         self.setup_ui()
+        
+        # Single worker thread reused for every (re)processing request
+        self.processor_thread = DataProcessorThread(self.processor, self)
+        self.processor_thread.processed.connect(self.on_data_processed)
+        self.processor_thread.error.connect(self.on_processing_error)
+        
         self.load_initial_data()
     
     def setup_ui(self):
@@ -207,6 +607,14 @@ class PortfolioReportingApp(QMainWindow):
         self.progress_bar.setVisible(False)
         self.status_bar.addPermanentWidget(self.progress_bar)
     
+    def closeEvent(self, event):
+        """Shut down the processing worker before the window closes"""
+        self.processor_thread.shutdown()
+        # Let an export in flight finish writing its file
+        for task in self.findChildren(BackgroundTask):
+            task.wait()
+        super().closeEvent(event)
+    
     def create_header(self, layout):
         """Create the application header"""
         header_frame = QFrame()
@@ -285,7 +693,7 @@ class PortfolioReportingApp(QMainWindow):
         activity_layout.addWidget(subtitle)
         
         # Create activity table
-        self.activity_table = CustomTableWidget()
+        self.activity_table = CustomTableView()
         activity_layout.addWidget(self.activity_table)
         
         self.tab_widget.addTab(activity_widget, "📈 Activity View")
@@ -333,42 +741,63 @@ class PortfolioReportingApp(QMainWindow):
         holdings_layout.addWidget(controls_frame)
         
         # Create holdings table
-        self.holdings_table = CustomTableWidget()
+        self.holdings_table = CustomTableView()
         holdings_layout.addWidget(self.holdings_table)
         
         self.tab_widget.addTab(holdings_widget, "💼 Current Holdings")
     
+    def run_in_background(self, func, *args, on_done, on_error):
+        """Run a blocking call on a worker thread, delivering the outcome to the GUI thread"""
+        task = BackgroundTask(func, *args, parent=self)
+        task.done.connect(on_done)
+        task.error.connect(on_error)
+        task.finished.connect(task.deleteLater)
+        task.start()
+    
+    def show_progress(self, message):
+        """Show the indeterminate progress bar with a status message"""
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setRange(0, 0)  # Indeterminate progress
+        self.status_bar.showMessage(message)
+    
     def load_initial_data(self):
-        """Load initial sample data"""
-        try:
-            self.data = load_sample_data()
-            self.process_data()
-            self.update_date_selector()
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to load initial data: {str(e)}")
+        """Load initial sample data without blocking window startup"""
+        self.show_progress("Loading data...")
+        self.run_in_background(load_sample_data, on_done=self.on_initial_data_loaded,
+                               on_error=self.on_initial_load_error)
+    
+    def on_initial_data_loaded(self, data):
+        """Process the sample data once it has been read"""
+        self.data = data
+        self.process_data()
+    
+    def on_initial_load_error(self, error_msg):
+        """Handle a failure reading the sample data"""
+        self.progress_bar.setVisible(False)
+        QMessageBox.critical(self, "Error", f"Failed to load initial data: {error_msg}")
     
     def process_data(self):
         """Process the loaded data"""
         if self.data is None:
             return
         
-        # Show progress
-        self.progress_bar.setVisible(True)
-        self.progress_bar.setRange(0, 0)  # Indeterminate progress
-        self.status_bar.showMessage("Processing data...")
+        self.show_progress("Processing data...")
         
-        # Create and start processing thread
-        self.processor_thread = DataProcessorThread(self.data, self.processor)
-        self.processor_thread.finished.connect(self.on_data_processed)
-        self.processor_thread.error.connect(self.on_processing_error)
-        self.processor_thread.start()
+        # Hand the data to the worker thread
+        self.processor_thread.process(self.data)
     
-    def on_data_processed(self, processed_data):
+    def on_data_processed(self):
         """Handle processed data"""
+        processed_data = self.processor_thread.result
         self.processed_data = processed_data
+        self._holdings_cache.clear()
+        # Original transaction columns, resolved once per load
+        self._main_cols = [c for c in processed_data.columns if get_column_level(c) is None]
+        # Sorted unique trade days as combo labels ('Trade date' is already datetime64)
+        trade_days = pd.to_datetime(processed_data['Trade date']).dropna().to_numpy().astype('datetime64[D]')
+        self._trade_date_strings = np.unique(trade_days).astype(str).tolist()
         self.populate_activity_table()
-        self.update_date_selector()  # Ensure date selector is populated after data is processed
-        self.refresh_holdings_view()
+        self.update_date_selector()  # Repopulates dates and refreshes holdings once
         
         # Hide progress
         self.progress_bar.setVisible(False)
@@ -387,108 +816,88 @@ class PortfolioReportingApp(QMainWindow):
         if self.processed_data is None:
             return
         
+        columns, col_headers, column_colors, column_widths, alignments, formatters = \
+            self.get_activity_layout()
+        
+        # Set up table; cells are formatted lazily by the model as they are painted
+        model = DataFrameModel(self.processed_data, columns, col_headers, column_colors,
+                               alignments, formatters, parent=self.activity_table)
+        self.activity_table.show_model(model, column_widths)
+    
+    def get_activity_layout(self):
+        """Return cached column order, headers, colors, widths, alignment and formatters"""
+        key = tuple(self.processed_data.dtypes.items())
+        if self._header_cache[0] == key:
+            return self._header_cache[1]
+        
         # Build column order and headers
         columns = []
         col_headers = []
         column_colors = []
         
         # Include original transaction columns first
-        main_cols = [c for c in self.processed_data.columns if get_column_level(c) is None]
-        for col in main_cols:
+        for col in self._main_cols:
             columns.append(col)
             col_headers.append(col)
             column_colors.append(QColor(255, 255, 255))  # White for main columns
         
         # Add calculated columns grouped by level
-        for group in COLUMN_GROUPS:
-            for field in group["fields"]:
-                col = f"{field} ({group['section']})"
-                columns.append(col)
-                
-                # Create multi-line header
-                if len(field) > 10:
-                    words = field.split(' ')
-                    if len(words) > 1:
-                        if len(words) >= 3:
-                            mid = len(words) // 2
-                            header = f"{' '.join(words[:mid])}\n{' '.join(words[mid:])}\n({group['section']})"
-                        else:
-                            header = f"{words[0]}\n{words[1]}\n({group['section']})"
-                    else:
-                        if len(field) > 15:
-                            mid = len(field) // 2
-                            header = f"{field[:mid]}\n{field[mid:]}\n({group['section']})"
-                        else:
-                            header = f"{field}\n({group['section']})"
-                else:
-                    header = f"{field}\n({group['section']})"
-                
-                col_headers.append(header)
-                column_colors.append(group["color"])
-        
-        # Set up table
-        self.activity_table.setColumnCount(len(columns))
-        self.activity_table.setHorizontalHeaderLabels(col_headers)
-        
-        # Set column widths
-        for i, col in enumerate(columns):
+        for col, header, color in _GENERATED_COLUMNS:
+            columns.append(col)
+            col_headers.append(header)
+            column_colors.append(color)
+        
+        # Per-column widths, display formatters and alignment
+        numeric_cols = set(self.processed_data.select_dtypes(include='number').columns)
+        column_widths = []
+        formatters = []
+        alignments = []
+        for col in columns:
             if "Security" in col or "Description" in col:
-                width = 160
+                column_widths.append(160)
             elif "Parent company" in col or "Legal entity" in col:
-                width = 200
-            elif any(keyword in col for keyword in ['Cost', 'Price', 'Total', 'Rate', 'Gain/Loss']):
-                width = 170
+                column_widths.append(200)
+            elif _WIDE_AMOUNT_RE.search(col):
+                column_widths.append(170)
             else:
-                width = 140
-            self.activity_table.setColumnWidth(i, width)
-        
-        # Set header colors
-        self.activity_table.set_header_colors(column_colors)
-        
-        # Format and populate data
-        display_data = self.processed_data.copy()
-        for col in display_data.columns:
-            if display_data[col].dtype in ["float64", "int64"]:
-                display_data[col] = display_data[col].apply(
-                    lambda x: f"{x:,.2f}" if pd.notna(x) and x != '' else '0.00'
-                )
-            elif 'Realized Gain/Loss' in col:
-                def format_rgl(value):
-                    if pd.isna(value) or value == '' or value == 0:
-                        return ''
-                    try:
-                        return f"{float(value):,.2f}"
-                    except (ValueError, TypeError):
-                        return ''
-                display_data[col] = display_data[col].apply(format_rgl)
-        
-        # Populate table
-        self.activity_table.setRowCount(len(display_data))
-        for row_idx, (_, row_data) in enumerate(display_data[columns].iterrows()):
-            for col_idx, value in enumerate(row_data):
-                item = QTableWidgetItem(str(value))
-                
-                # Set alignment
-                if any(keyword in columns[col_idx] for keyword in ['Cost', 'Quantity', 'Price', 'Total', 'Gain/Loss', 'WAC']):
-                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                else:
-                    item.setTextAlignment(Qt.AlignLeft | Qt.AlignVCenter)
-                
-                self.activity_table.setItem(row_idx, col_idx, item)
+                column_widths.append(140)
+            
+            # Realized gain/loss is checked first: those columns are float too,
+            # but non-sell rows should read blank rather than 0.00
+            if col in _RGL_COLUMNS:
+                formatters.append(format_rgl)
+            elif col in numeric_cols:
+                formatters.append(format_amounts)
+            else:
+                formatters.append(format_text)
+            
+            if _RIGHT_ALIGN_RE.search(col):
+                alignments.append(int(Qt.AlignRight | Qt.AlignVCenter))
+            else:
+                alignments.append(int(Qt.AlignLeft | Qt.AlignVCenter))
+        
+        layout = (columns, col_headers, column_colors, column_widths, alignments, formatters)
+        self._header_cache = (key, layout)
+        return layout
     
     def update_date_selector(self):
         """Update the date selector with available dates"""
         if self.processed_data is None:
             return
         
-        available_dates = sorted(pd.to_datetime(self.processed_data['Trade date']).dt.date.unique())
-        latest_date = max(available_dates) if available_dates else None
-        
-        self.holdings_date_combo.clear()
-        self.holdings_date_combo.addItems([str(d) for d in available_dates])
+        # Block currentTextChanged while refilling so holdings are not
+        # recomputed once per date added
+        self.holdings_date_combo.blockSignals(True)
+        try:
+            self.holdings_date_combo.clear()
+            self.holdings_date_combo.addItems(self._trade_date_strings)
+            
+            if self._trade_date_strings:
+                self.holdings_date_combo.setCurrentText(self._trade_date_strings[-1])
+        finally:
+            self.holdings_date_combo.blockSignals(False)
         
-        if latest_date:
-            self.holdings_date_combo.setCurrentText(str(latest_date))
+        self.refresh_holdings_view()
     
     def refresh_holdings_view(self):
         """Refresh the holdings view"""
@@ -501,76 +910,82 @@ class PortfolioReportingApp(QMainWindow):
         if not selected_date:
             return
         
-        # Get holdings data
-        holdings_data = self.processor.get_holdings_snapshot(
-            self.processed_data, selected_date, selected_level
+        holdings_cols, column_widths, alignments, formatters = self._holdings_layouts.get(
+            selected_level, self._holdings_layouts[None]
         )
         
+        # Get holdings data; snapshots are pure functions of (data, level, date)
+        key = (id(self.processed_data), selected_level, selected_date)
+        holdings_data = self._holdings_cache.get(key)
+        if holdings_data is None:
+            holdings_data = self.processor.get_holdings_snapshot(
+                self.processed_data, selected_date, selected_level, columns=holdings_cols
+            )
+            self._holdings_cache[key] = holdings_data
+            if len(self._holdings_cache) > HOLDINGS_CACHE_SIZE:
+                self._holdings_cache.popitem(last=False)
+        else:
+            self._holdings_cache.move_to_end(key)
+        
         if holdings_data.empty:
-            self.holdings_table.setRowCount(0)
-            self.holdings_table.setColumnCount(0)
+            self.holdings_table.show_model(DataFrameModel(parent=self.holdings_table))
             return
         
-        # Define columns based on level - Focus on core holdings metrics
-        if selected_level == "Portfolio":
-            holdings_cols = ['Portfolio', 'Security', 'Current Quantity', 'Current Cost USD', 'WAC per Unit USD', 'Current Cost CCY', 'WAC per Unit CCY']
-        elif selected_level == "Parent company":
-            holdings_cols = ['Portfolio', 'Parent company', 'Security', 'Current Quantity', 'Current Cost USD', 'WAC per Unit USD', 'Current Cost CCY', 'WAC per Unit CCY']
-        elif selected_level == "Legal entity":
-            holdings_cols = ['Portfolio', 'Parent company', 'Legal entity', 'Security', 'Current Quantity', 'Current Cost USD', 'WAC per Unit USD', 'Current Cost CCY', 'WAC per Unit CCY']
-        elif selected_level == "Account":
-            holdings_cols = ['Portfolio', 'Parent company', 'Legal entity', 'Custodian', 'Account', 'Security', 'Current Quantity', 'Current Cost USD', 'WAC per Unit USD', 'Current Cost CCY', 'WAC per Unit CCY']
-        else:
-            holdings_cols = ['Security', 'Current Quantity', 'Current Cost USD', 'WAC per Unit USD', 'Current Cost CCY', 'WAC per Unit CCY']
-        
         # Filter to available columns
-        available_cols = [col for col in holdings_cols if col in holdings_data.columns]
-        holdings_data = holdings_data[available_cols]
-        
-        # Format numeric columns
-        for col in holdings_data.columns:
-            if any(keyword in col for keyword in ['Quantity', 'Cost', 'WAC', 'Value']):
-                holdings_data[col] = holdings_data[col].apply(
-                    lambda x: f"{x:,.2f}" if pd.notna(x) else '0.00'
-                )
-        
-        # Set up holdings table
-        self.holdings_table.setColumnCount(len(available_cols))
-        self.holdings_table.setHorizontalHeaderLabels(available_cols)
-        
-        # Set column widths
-        for i, col in enumerate(available_cols):
-            if col in ['Portfolio', 'Parent company', 'Legal entity']:
-                width = 200
-            elif col == 'Security':
-                width = 180
-            elif any(keyword in col for keyword in ['Cost USD', 'WAC USD']):
-                width = 150
-            elif any(keyword in col for keyword in ['Cost CCY', 'WAC CCY']):
-                width = 140
-            elif col == 'Current Quantity':
-                width = 130
-            else:
-                width = 120
-            self.holdings_table.setColumnWidth(i, width)
+        keep = [i for i, col in enumerate(holdings_cols) if col in holdings_data.columns]
+        available_cols = [holdings_cols[i] for i in keep]
         
-        # Set header color (green for holdings)
+        # Set up holdings table (green header for holdings)
         header_colors = [QColor(39, 174, 96)] * len(available_cols)  # Green
-        self.holdings_table.set_header_colors(header_colors)
-        
-        # Populate table
-        self.holdings_table.setRowCount(len(holdings_data))
-        for row_idx, (_, row_data) in enumerate(holdings_data.iterrows()):
-            for col_idx, value in enumerate(row_data):
-                item = QTableWidgetItem(str(value))
+        model = DataFrameModel(holdings_data, available_cols, available_cols, header_colors,
+                               [alignments[i] for i in keep], [formatters[i] for i in keep],
+                               parent=self.holdings_table)
+        self.holdings_table.show_model(model, [column_widths[i] for i in keep])
+    
+    def build_holdings_layouts(self):
+        """Build the static holdings column layout for each consolidation level"""
+        metric_cols = ['Current Quantity', 'Current Cost USD', 'WAC per Unit USD', 'Current Cost CCY', 'WAC per Unit CCY']
+        level_cols = {
+            "Portfolio": ['Portfolio', 'Security'],
+            "Parent company": ['Portfolio', 'Parent company', 'Security'],
+            "Legal entity": ['Portfolio', 'Parent company', 'Legal entity', 'Security'],
+            "Account": ['Portfolio', 'Parent company', 'Legal entity', 'Custodian', 'Account', 'Security'],
+            None: ['Security'],
+        }
+        
+        layouts = {}
+        for level, key_cols in level_cols.items():
+            holdings_cols = key_cols + metric_cols
+            column_widths = []
+            alignments = []
+            formatters = []
+            for col in holdings_cols:
+                if col in ['Portfolio', 'Parent company', 'Legal entity']:
+                    column_widths.append(200)
+                elif col == 'Security':
+                    column_widths.append(180)
+                elif _HOLDINGS_USD_RE.search(col):
+                    column_widths.append(150)
+                elif _HOLDINGS_CCY_RE.search(col):
+                    column_widths.append(140)
+                elif col == 'Current Quantity':
+                    column_widths.append(130)
+                else:
+                    column_widths.append(120)
                 
-                # Set alignment
-                if any(keyword in available_cols[col_idx] for keyword in ['Quantity', 'Cost', 'WAC']):
-                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                # Format numeric columns and align them right
+                if _HOLDINGS_AMOUNT_RE.search(col):
+                    formatters.append(format_amounts)
                 else:
-                    item.setTextAlignment(Qt.AlignLeft | Qt.AlignVCenter)
+                    formatters.append(format_text)
                 
-                self.holdings_table.setItem(row_idx, col_idx, item)
+                if _HOLDINGS_RIGHT_ALIGN_RE.search(col):
+                    alignments.append(int(Qt.AlignRight | Qt.AlignVCenter))
+                else:
+                    alignments.append(int(Qt.AlignLeft | Qt.AlignVCenter))
+            
+            layouts[level] = (holdings_cols, column_widths, alignments, formatters)
+        return layouts
     
     def load_file(self):
         """Load Excel file dialog"""
@@ -579,22 +994,34 @@ class PortfolioReportingApp(QMainWindow):
         )
         
         if file_path:
-            try:
-                self.data = pd.read_excel(file_path)
-                
-                # Validate data
-                is_valid, errors = self.processor.validate_data(self.data)
-                if not is_valid:
-                    QMessageBox.critical(self, "Data Validation Error", 
-                                       "Data validation failed:\n" + "\n".join(errors))
-                    return
-                
-                self.process_data()
-                self.update_date_selector()
-                QMessageBox.information(self, "Success", f"Loaded {len(self.data)} transactions")
-                
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Failed to load file: {str(e)}")
+            # Parsing the workbook can take seconds, so it runs off the GUI thread
+            self.show_progress("Loading file...")
+            self.run_in_background(read_transactions, file_path,
+                                   on_done=self.on_file_loaded, on_error=self.on_file_load_error)
+    
+    def on_file_loaded(self, data):
+        """Validate and process a workbook read by load_file"""
+        try:
+            self.data = data
+            
+            # Validate data
+            is_valid, errors = self.processor.validate_data(self.data)
+            if not is_valid:
+                self.progress_bar.setVisible(False)
+                QMessageBox.critical(self, "Data Validation Error", 
+                                   "Data validation failed:\n" + "\n".join(errors))
+                return
+            
+            self.process_data()
+            QMessageBox.information(self, "Success", f"Loaded {len(self.data)} transactions")
+            
+        except Exception as e:
+            self.on_file_load_error(str(e))
+    
+    def on_file_load_error(self, error_msg):
+        """Handle a failure loading a workbook"""
+        self.progress_bar.setVisible(False)
+        QMessageBox.critical(self, "Error", f"Failed to load file: {error_msg}")
     
     def export_to_excel(self):
         """Export data to Excel"""
@@ -608,48 +1035,77 @@ class PortfolioReportingApp(QMainWindow):
         )
         
         if file_path:
-            try:
-                with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
-                    self.processed_data.to_excel(writer, sheet_name='Activity', index=False)
-                    
-                    # Apply formatting
-                    self.apply_excel_formatting(writer.book, writer.sheets['Activity'])
-                
-                QMessageBox.information(self, "Success", f"Data exported to {file_path}")
-                
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Failed to export data: {str(e)}")
-    
-    def apply_excel_formatting(self, workbook, worksheet):
-        """Apply formatting to Excel worksheet"""
-        # Define styles
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="2C3E50", end_color="2C3E50", fill_type="solid")
-        header_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-        
-        # Apply header formatting
-        for cell in worksheet[1]:
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-        
-        # Set header row height
-        worksheet.row_dimensions[1].height = 60
-        
-        # Auto-adjust column widths
-        for column in worksheet.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
+            # The processed frame is only read while the file is written
+            self.show_progress("Exporting data...")
+            self.run_in_background(self.write_excel, self.processed_data, file_path,
+                                   on_done=self.on_export_finished, on_error=self.on_export_error)
+    
+    def on_export_finished(self, file_path):
+        """Report a completed export"""
+        self.progress_bar.setVisible(False)
+        self.status_bar.showMessage(f"Exported to {file_path}")
+        QMessageBox.information(self, "Success", f"Data exported to {file_path}")
+    
+    def on_export_error(self, error_msg):
+        """Report a failed export"""
+        self.progress_bar.setVisible(False)
+        QMessageBox.critical(self, "Error", f"Failed to export data: {error_msg}")
+    
+    def write_excel(self, data, file_path):
+        """Write data to an Excel file with the fastest available writer"""
+        if xlsxwriter is not None:
+            self.write_excel_xlsxwriter(data, file_path)
+        else:
+            self.write_excel_openpyxl(data, file_path)
+        return file_path
+    
+    def write_excel_xlsxwriter(self, data, file_path):
+        """Stream data to an Excel file with XlsxWriter in constant-memory mode"""
+        # constant_memory flushes each row as soon as the next one starts,
+        # so rows must be written strictly in order
+        workbook = xlsxwriter.Workbook(file_path, {
+            'constant_memory': True,
+            'default_date_format': 'yyyy-mm-dd hh:mm:ss',
+        })
+        # Closed even if a write fails, so the constant_memory temp files are removed
+        try:
+            worksheet = workbook.add_worksheet('Activity')
+            header_format = workbook.add_format(HEADER_FORMAT)
             
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
+            # Sheet layout must be set before any rows are written
+            worksheet.set_row(0, 60)
+            for i, width in enumerate(export_column_widths(data)):
+                worksheet.set_column(i, i, width)
             
-            adjusted_width = min(max_length + 2, 50)
-            worksheet.column_dimensions[column_letter].width = adjusted_width
+            worksheet.write_row(0, 0, [str(col) for col in data.columns], header_format)
+            for row_idx, row in enumerate(iter_export_rows(data), start=1):
+                worksheet.write_row(row_idx, 0, row)
+        finally:
+            workbook.close()
+    
+    def write_excel_openpyxl(self, data, file_path):
+        """Stream data to an Excel file with an openpyxl write-only workbook"""
+        workbook = openpyxl.Workbook(write_only=True)
+        worksheet = workbook.create_sheet('Activity')
+        
+        # Sheet layout must be set before any rows are appended
+        worksheet.row_dimensions[1].height = 60
+        for i, width in enumerate(export_column_widths(data), start=1):
+            worksheet.column_dimensions[get_column_letter(i)].width = width
+        
+        header_cells = []
+        for col in data.columns:
+            cell = WriteOnlyCell(worksheet, value=str(col))
+            cell.font = OPENPYXL_HEADER_FONT
+            cell.fill = OPENPYXL_HEADER_FILL
+            cell.alignment = OPENPYXL_HEADER_ALIGNMENT
+            header_cells.append(cell)
+        worksheet.append(header_cells)
+        
+        for row in iter_export_rows(data):
+            worksheet.append(row)
+        
+        workbook.save(file_path)
 
 def main():
     app = QApplication(sys.argv)
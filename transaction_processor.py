@@ -1,6 +1,124 @@
+import weakref
+import numpy as np
 import pandas as pd
-from collections import defaultdict
-from typing import Dict, Any, List, Tuple
+from typing import List, Tuple
+try:
+    import numba
+except ImportError:  # The WAC kernel then runs as plain Python over NumPy arrays
+    numba = None
+
+# Fields of the running WAC state, one row of the state matrix per group/security
+STATE_QTY, STATE_COST_CCY, STATE_COST_USD, STATE_WAC_CCY, STATE_WAC_USD = range(5)
+
+def _wac_kernel(group_ids, n_groups, qty, price, fx_rate, total_ccy, total_usd, is_buy):
+    """Run the WAC state machine for every consolidation level in one chronological pass"""
+    n, n_levels = group_ids.shape
+    # Calculated values per transaction and level, in level_col_order
+    out = np.zeros((n, n_levels, 9))
+    short = np.zeros((n, n_levels), dtype=np.bool_)
+    
+    # Running state per group/security, one contiguous row each; the levels' group ids
+    # share one numbering
+    state = np.zeros((n_groups, 5))
+    
+    for i in range(n):
+        for level in range(n_levels):
+            g = group_ids[i, level]
+            
+            # ACCOUNTING PRINCIPLE: Transaction costs and quantities must have consistent signs
+            # Buys: positive quantity, positive cost
+            # Sells: negative quantity, negative cost (cost basis release)
+            
+            if is_buy[i]:
+                # BUY TRANSACTION
+                transaction_cost_ccy = abs(total_ccy[i])  # Cost paid (positive)
+                transaction_cost_usd = abs(total_usd[i])  # Cost paid (positive)
+                transaction_qty = abs(qty[i])  # Shares acquired (positive)
+            
+                # Update cumulative position
+                new_cumulative_qty = state[g, STATE_QTY] + transaction_qty
+                new_cumulative_cost_ccy = state[g, STATE_COST_CCY] + transaction_cost_ccy
+                new_cumulative_cost_usd = state[g, STATE_COST_USD] + transaction_cost_usd
+            
+                # Calculate new WAC (only changes on buys)
+                if new_cumulative_qty > 0:
+                    new_wac_ccy = new_cumulative_cost_ccy / new_cumulative_qty
+                    new_wac_usd = new_cumulative_cost_usd / new_cumulative_qty
+                else:
+                    new_wac_ccy = 0.0
+                    new_wac_usd = 0.0
+            
+                # No realized P&L on buys
+                realized_pnl_ccy = 0.0
+                realized_pnl_usd = 0.0
+            
+            else:
+                # SELL TRANSACTION
+                transaction_qty = -abs(qty[i])  # Shares sold (negative)
+            
+                # CRITICAL: Use CURRENT WAC before this transaction for cost basis release
+                current_wac_ccy = state[g, STATE_WAC_CCY]
+                current_wac_usd = state[g, STATE_WAC_USD]
+            
+                # Transaction cost = cost basis being released (negative to show release)
+                transaction_cost_ccy = current_wac_ccy * transaction_qty  # Negative (cost released)
+                transaction_cost_usd = current_wac_usd * transaction_qty  # Negative (cost released)
+            
+                # Calculate realized P&L
+                # P&L = Proceeds - Cost Basis Released
+                sale_proceeds_ccy = price[i] * abs(qty[i])  # What we received
+                sale_proceeds_usd = price[i] * fx_rate[i] * abs(qty[i])  # What we received in USD
+                cost_basis_released_ccy = current_wac_ccy * abs(qty[i])  # Cost basis of shares sold
+                cost_basis_released_usd = current_wac_usd * abs(qty[i])  # Cost basis of shares sold
+            
+                realized_pnl_ccy = sale_proceeds_ccy - cost_basis_released_ccy
+                realized_pnl_usd = sale_proceeds_usd - cost_basis_released_usd
+            
+                # Update cumulative position
+                new_cumulative_qty = state[g, STATE_QTY] + transaction_qty
+                new_cumulative_cost_ccy = state[g, STATE_COST_CCY] + transaction_cost_ccy
+                new_cumulative_cost_usd = state[g, STATE_COST_USD] + transaction_cost_usd
+            
+                # CRITICAL: WAC per unit does NOT change on sells, only the cumulative amounts change
+                if new_cumulative_qty > 0:
+                    # Position still exists, WAC remains the same
+                    new_wac_ccy = current_wac_ccy
+                    new_wac_usd = current_wac_usd
+                elif new_cumulative_qty == 0:
+                    # Position fully closed
+                    new_wac_ccy = 0.0
+                    new_wac_usd = 0.0
+                    new_cumulative_cost_ccy = 0.0  # Ensure no rounding errors
+                    new_cumulative_cost_usd = 0.0
+                else:
+                    # Short position - flagged for a warning by the caller
+                    short[i, level] = True
+                    new_wac_ccy = current_wac_ccy
+                    new_wac_usd = current_wac_usd
+            
+            # Record the calculated values
+            out[i, level, 0] = transaction_cost_usd
+            out[i, level, 1] = transaction_cost_ccy
+            out[i, level, 2] = new_cumulative_qty
+            out[i, level, 3] = new_cumulative_cost_ccy
+            out[i, level, 4] = new_cumulative_cost_usd
+            out[i, level, 5] = new_wac_usd
+            out[i, level, 6] = new_wac_ccy
+            out[i, level, 7] = realized_pnl_ccy
+            out[i, level, 8] = realized_pnl_usd
+            
+            # Update the security state for next transaction
+            state[g, STATE_QTY] = new_cumulative_qty
+            state[g, STATE_COST_CCY] = new_cumulative_cost_ccy
+            state[g, STATE_COST_USD] = new_cumulative_cost_usd
+            state[g, STATE_WAC_CCY] = new_wac_ccy
+            state[g, STATE_WAC_USD] = new_wac_usd
+    
+    return out, short
+
+if numba is not None:
+    # Compiled to machine code on first use and cached on disk
+    _wac_kernel = numba.njit(cache=True)(_wac_kernel)
 
 class TransactionProcessor:
     """Process security transactions and calculate WAC basis with multi-level consolidation"""
@@ -15,15 +133,47 @@ class TransactionProcessor:
             "Account": ["Portfolio", "Parent company", "Legal entity", "Custodian", "Account"]
         }
         
+        # Calculated columns produced for each level, in output order
+        self.level_col_order = [
+            'Transaction Cost USD', 'Transaction Cost CCY', 'Cumulative Quantity',
+            'Cumulative Cost CCY', 'Cumulative Cost USD', 'Cost per Unit USD',
+            'Cost per Unit CCY', 'Realized Gain/Loss CCY', 'Realized Gain/Loss USD'
+        ]
+        
+        # Full output column name for each calculated column, per level, built once
+        self.level_columns = {
+            level: {base: f'{base} ({level})' for base in self.level_col_order}
+            for level in self.levels
+        }
+        
+        # Input columns that are parsed as numbers / dates before processing
+        self.numeric_cols = ['Quantity', 'Price', 'FX rate', 'Total (Original CCY)', 'Total USD']
+        self.date_cols = ['Trade date', 'Settle date']
+        
         # Required columns for processing
         self.required_columns = [
             'Portfolio', 'Parent company', 'Legal entity', 'Custodian', 'Account',
             'Security', 'Currency', 'B/S', 'Trade ID', 'Trade date', 'Settle date',
             'Quantity', 'Price', 'FX rate', 'Total (Original CCY)', 'Total USD'
         ]
+        
+        # Most recent validation as (weak reference to the frame, schema fingerprint, result);
+        # loaded frames are treated as read-only, so re-validating the same one is skipped
+        self._last_validation = None
+        
+        # Snapshot keys of the most recent frame as (weak reference, column fingerprint,
+        # {'order': chronological row order, level: group ids}); the holdings view snapshots
+        # one processed frame many times
+        self._snapshot_keys = None
     
     def validate_data(self, df: pd.DataFrame) -> Tuple[bool, List[str]]:
         """Validate input data has required columns and proper format"""
+        fingerprint = (df.shape, tuple(df.columns), tuple(df.dtypes))
+        if self._last_validation is not None:
+            frame_ref, last_fingerprint, (is_valid, errors) = self._last_validation
+            if frame_ref() is df and last_fingerprint == fingerprint:
+                return is_valid, list(errors)
+        
         errors = []
         
         # Check for required columns
@@ -31,291 +181,198 @@ class TransactionProcessor:
         if missing_cols:
             errors.append(f"Missing required columns: {', '.join(missing_cols)}")
         
-        # Check data types for numeric columns
-        numeric_cols = ['Quantity', 'Price', 'FX rate', 'Total (Original CCY)', 'Total USD']
-        for col in numeric_cols:
-            if col in df.columns:
+        # Check data types for numeric columns; columns the reader already typed need no parse
+        for col in self.numeric_cols:
+            if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
                 try:
                     pd.to_numeric(df[col], errors='coerce')
                 except:
                     errors.append(f"Column '{col}' contains non-numeric values")
         
         # Check date columns
-        date_cols = ['Trade date', 'Settle date']
-        for col in date_cols:
-            if col in df.columns:
+        for col in self.date_cols:
+            if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
                 try:
                     pd.to_datetime(df[col], errors='coerce')
                 except:
                     errors.append(f"Column '{col}' contains invalid date values")
         
+        self._last_validation = (weakref.ref(df), fingerprint, (len(errors) == 0, list(errors)))
         return len(errors) == 0, errors
     
     def process_transactions(self, df: pd.DataFrame) -> pd.DataFrame:
         """Process transactions and calculate WAC basis for all consolidation levels"""
-        # Make a copy to avoid modifying original data
-        df = df.copy()
+        # Shallow copy: column writes below replace arrays in this frame only, so the
+        # caller's data is untouched without duplicating every column up front
+        df = df.copy(deep=False)
         
-        # Ensure date columns are datetime
-        df['Trade date'] = pd.to_datetime(df['Trade date'])
-        df['Settle date'] = pd.to_datetime(df['Settle date'])
+        # Ensure date columns are datetime (already-typed columns are left as they are)
+        for col in self.date_cols:
+            if not pd.api.types.is_datetime64_any_dtype(df[col]):
+                df[col] = pd.to_datetime(df[col])
         
-        # Ensure numeric columns are numeric
-        numeric_cols = ['Quantity', 'Price', 'FX rate', 'Total (Original CCY)', 'Total USD']
-        for col in numeric_cols:
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+        # Ensure numeric columns are numeric, skipping columns that are already clean
+        for col in self.numeric_cols:
+            if not pd.api.types.is_numeric_dtype(df[col]) or df[col].hasnans:
+                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
         
-        # Define the order of calculated columns for each level
-        level_col_order = [
-            'Transaction Cost USD', 'Transaction Cost CCY', 'Cumulative Quantity',
-            'Cumulative Cost CCY', 'Cumulative Cost USD', 'Cost per Unit USD',
-            'Cost per Unit CCY', 'Realized Gain/Loss CCY', 'Realized Gain/Loss USD'
-        ]
+        # Process all consolidation levels together; the output buffer becomes one block of
+        # calculated columns (level by level, in level_col_order) joined on in a single step
+        results = self._process_levels(df)
+        calc_cols = [col for level in self.levels for col in self.level_columns[level].values()]
+        calculated = pd.DataFrame(results.reshape(len(df), len(calc_cols)), index=df.index,
+                                  columns=calc_cols)
         
-        # Initialize calculated columns for each level
-        for level in self.levels:
-            for base in level_col_order:
-                col = f'{base} ({level})'
-                if 'Realized Gain/Loss' in base:
-                    df[col] = 0.0  # Initialize as 0.0 instead of empty string
-                else:
-                    df[col] = 0.0
+        # Re-processing a processed frame replaces its calculated columns rather than duplicating them
+        stale_cols = df.columns.intersection(calc_cols)
+        if len(stale_cols):
+            df = df.drop(columns=stale_cols)
+        return pd.concat([df, calculated], axis=1, copy=False)
+    
+    def _process_levels(self, df: pd.DataFrame) -> np.ndarray:
+        """Calculate every level's columns in one pass, returned as (row, level, field) in row order"""
+        # Sort by trade date to ensure chronological processing; `order` holds row positions
+        sort_cols = ['Trade date', 'Trade ID']
+        order = df[sort_cols].reset_index(drop=True).sort_values(sort_cols).index.to_numpy()
         
-        # Process each consolidation level
-        for level in self.levels:
-            self._process_level(df, level)
+        # Integer id per group/security so state lives in arrays (no per-row key tuples);
+        # ids are offset per level so all levels share one set of state arrays
+        # Key columns are factorized once (categorical-style codes, blanks included) so the
+        # per-level groupbys compare integers instead of re-hashing the label strings
+        key_cols = self.group_keys[self.levels[-1]] + ['Security']
+        key_codes = pd.DataFrame({col: pd.factorize(df[col], use_na_sentinel=False)[0] for col in key_cols})
+        group_ids = np.empty((len(order), len(self.levels)), dtype=np.int64)
+        n_groups = 0
+        for j, level in enumerate(self.levels):
+            group_cols = self.group_keys[level] + ['Security']  # Group by consolidation level + Security
+            ids = key_codes.groupby(group_cols, sort=False).ngroup().to_numpy()
+            group_ids[:, j] = ids[order] + n_groups
+            n_groups += int(ids.max()) + 1 if len(ids) else 0
         
-        return df
-    
-    def _process_level(self, df: pd.DataFrame, level: str):
-        """Process all transactions for a specific consolidation level"""
-        # Initialize state tracking for each security within each group
-        state: Dict[Any, Dict[str, Dict[str, float]]] = defaultdict(lambda: defaultdict(lambda: {
-            'cumulative_qty': 0.0,
-            'cumulative_cost_ccy': 0.0,
-            'cumulative_cost_usd': 0.0,
-            'wac_per_unit_ccy': 0.0,
-            'wac_per_unit_usd': 0.0
-        }))
+        # Transaction fields as contiguous float64 arrays in chronological order
+        qty, price, fx_rate, total_ccy, total_usd = (
+            df[col].to_numpy(dtype=np.float64)[order]
+            for col in ['Quantity', 'Price', 'FX rate', 'Total (Original CCY)', 'Total USD']
+        )
+        # Buy/sell flag: B/S repeats a handful of spellings, so each distinct one is parsed once
+        codes, sides = pd.factorize(df['B/S'], use_na_sentinel=False)
+        side_is_buy = np.array([str(side).strip().upper().startswith('B') for side in sides], dtype=np.bool_)
+        is_buy = side_is_buy[codes][order]
         
-        group_cols = self.group_keys[level] + ['Security']  # Group by consolidation level + Security
+        out, short = _wac_kernel(group_ids, n_groups, qty, price, fx_rate,
+                                 total_ccy, total_usd, is_buy)
         
-        # Sort by trade date to ensure chronological processing
-        df_sorted = df.sort_values(['Trade date', 'Trade ID']).copy()
+        for j in range(len(self.levels)):
+            for pos in np.flatnonzero(short[:, j]):
+                # Short position - this shouldn't happen with WAC but handle gracefully
+                print(f"Warning: Short position detected at row {df.index[order[pos]]}")
         
-        # Process each transaction
-        for idx in df_sorted.index:
-            row = df_sorted.loc[idx]
-            
-            # Create group key for this consolidation level
-            if level == "Portfolio":
-                group_key = row['Portfolio']
-            elif level == "Parent company":
-                group_key = (row['Portfolio'], row['Parent company'])
-            elif level == "Legal entity":
-                group_key = (row['Portfolio'], row['Parent company'], row['Legal entity'])
-            elif level == "Account":
-                group_key = (row['Portfolio'], row['Parent company'], row['Legal entity'], 
-                           row['Custodian'], row['Account'])
-            
-            security = row['Security']
-            
-            # Process this transaction
-            self._process_single_transaction(df, idx, level, state[group_key][security], row)
+        # Results come back in chronological order; scatter them to the frame's row order
+        results = np.empty_like(out)
+        results[order] = out
+        return results
     
-    def _process_single_transaction(self, df: pd.DataFrame, idx: int, level: str, 
-                                  security_state: Dict[str, float], row: pd.Series):
-        """Process a single transaction and update the security state"""
-        try:
-            # Extract transaction details
-            qty = float(row['Quantity'])
-            price = float(row['Price'])
-            fx_rate = float(row['FX rate'])
-            total_ccy = float(row['Total (Original CCY)'])
-            total_usd = float(row['Total USD'])
-            is_buy = str(row['B/S']).strip().upper().startswith('B')
-            
-            # ACCOUNTING PRINCIPLE: Transaction costs and quantities must have consistent signs
-            # Buys: positive quantity, positive cost
-            # Sells: negative quantity, negative cost (cost basis release)
-            
-            if is_buy:
-                # BUY TRANSACTION
-                transaction_cost_ccy = abs(total_ccy)  # Cost paid (positive)
-                transaction_cost_usd = abs(total_usd)  # Cost paid (positive)
-                transaction_qty = abs(qty)  # Shares acquired (positive)
-                
-                # Update cumulative position
-                new_cumulative_qty = security_state['cumulative_qty'] + transaction_qty
-                new_cumulative_cost_ccy = security_state['cumulative_cost_ccy'] + transaction_cost_ccy
-                new_cumulative_cost_usd = security_state['cumulative_cost_usd'] + transaction_cost_usd
-                
-                # Calculate new WAC (only changes on buys)
-                if new_cumulative_qty > 0:
-                    new_wac_ccy = new_cumulative_cost_ccy / new_cumulative_qty
-                    new_wac_usd = new_cumulative_cost_usd / new_cumulative_qty
-                else:
-                    new_wac_ccy = 0.0
-                    new_wac_usd = 0.0
-                
-                # No realized P&L on buys
-                realized_pnl_ccy = 0.0
-                realized_pnl_usd = 0.0
-                
+    def _cached_snapshot_keys(self, df: pd.DataFrame) -> dict:
+        """Snapshot key cache for df, reset whenever a different frame comes in"""
+        fingerprint = (df.shape, tuple(df.columns))
+        cached = self._snapshot_keys
+        if cached is None or cached[0]() is not df or cached[1] != fingerprint:
+            cached = self._snapshot_keys = (weakref.ref(df), fingerprint, {})
+        return cached[2]
+    
+    def _group_ids(self, df: pd.DataFrame, level: str) -> np.ndarray:
+        """Group number of every row of df for a level (-1 where a key is blank), cached per frame"""
+        cache = self._cached_snapshot_keys(df)
+        group_ids = cache.get(level)
+        if group_ids is None:
+            group_cols = self.group_keys[level] + ['Security']
+            group_ids = (df.groupby(group_cols, sort=False, observed=True).ngroup()
+                         .fillna(-1).to_numpy(dtype=np.int64))
+            cache[level] = group_ids
+        return group_ids
+    
+    def _chronological_order(self, df: pd.DataFrame) -> np.ndarray:
+        """Row positions of df in (Trade date, Trade ID) order, stable for ties, cached per frame"""
+        cache = self._cached_snapshot_keys(df)
+        order = cache.get('order')
+        if order is None:
+            chrono_cols = ['Trade date', 'Trade ID']
+            if df['Trade date'].is_monotonic_increasing and df['Trade date'].is_unique:
+                # Already in trade order (as processed files usually are): nothing to sort
+                order = np.arange(len(df))
             else:
-                # SELL TRANSACTION
-                transaction_qty = -abs(qty)  # Shares sold (negative)
-                
-                # CRITICAL: Use CURRENT WAC before this transaction for cost basis release
-                current_wac_ccy = security_state['wac_per_unit_ccy']
-                current_wac_usd = security_state['wac_per_unit_usd']
-                
-                # Transaction cost = cost basis being released (negative to show release)
-                transaction_cost_ccy = current_wac_ccy * transaction_qty  # Negative (cost released)
-                transaction_cost_usd = current_wac_usd * transaction_qty  # Negative (cost released)
-                
-                # Calculate realized P&L
-                # P&L = Proceeds - Cost Basis Released
-                sale_proceeds_ccy = price * abs(qty)  # What we received
-                sale_proceeds_usd = price * fx_rate * abs(qty)  # What we received in USD
-                cost_basis_released_ccy = current_wac_ccy * abs(qty)  # Cost basis of shares sold
-                cost_basis_released_usd = current_wac_usd * abs(qty)  # Cost basis of shares sold
-                
-                realized_pnl_ccy = sale_proceeds_ccy - cost_basis_released_ccy
-                realized_pnl_usd = sale_proceeds_usd - cost_basis_released_usd
-                
-                # Update cumulative position
-                new_cumulative_qty = security_state['cumulative_qty'] + transaction_qty
-                new_cumulative_cost_ccy = security_state['cumulative_cost_ccy'] + transaction_cost_ccy
-                new_cumulative_cost_usd = security_state['cumulative_cost_usd'] + transaction_cost_usd
-                
-                # CRITICAL: WAC per unit does NOT change on sells, only the cumulative amounts change
-                if new_cumulative_qty > 0:
-                    # Position still exists, WAC remains the same
-                    new_wac_ccy = current_wac_ccy
-                    new_wac_usd = current_wac_usd
-                elif new_cumulative_qty == 0:
-                    # Position fully closed
-                    new_wac_ccy = 0.0
-                    new_wac_usd = 0.0
-                    new_cumulative_cost_ccy = 0.0  # Ensure no rounding errors
-                    new_cumulative_cost_usd = 0.0
-                else:
-                    # Short position - this shouldn't happen with WAC but handle gracefully
-                    print(f"Warning: Short position detected at row {idx}")
-                    new_wac_ccy = current_wac_ccy
-                    new_wac_usd = current_wac_usd
-            
-            # Update the dataframe with calculated values
-            df.at[idx, f'Transaction Cost USD ({level})'] = transaction_cost_usd
-            df.at[idx, f'Transaction Cost CCY ({level})'] = transaction_cost_ccy
-            df.at[idx, f'Cumulative Quantity ({level})'] = new_cumulative_qty
-            df.at[idx, f'Cumulative Cost CCY ({level})'] = new_cumulative_cost_ccy
-            df.at[idx, f'Cumulative Cost USD ({level})'] = new_cumulative_cost_usd
-            df.at[idx, f'Cost per Unit USD ({level})'] = new_wac_usd
-            df.at[idx, f'Cost per Unit CCY ({level})'] = new_wac_ccy
-            df.at[idx, f'Realized Gain/Loss CCY ({level})'] = realized_pnl_ccy
-            df.at[idx, f'Realized Gain/Loss USD ({level})'] = realized_pnl_usd
-            
-            # Update the security state for next transaction
-            security_state['cumulative_qty'] = new_cumulative_qty
-            security_state['cumulative_cost_ccy'] = new_cumulative_cost_ccy
-            security_state['cumulative_cost_usd'] = new_cumulative_cost_usd
-            security_state['wac_per_unit_ccy'] = new_wac_ccy
-            security_state['wac_per_unit_usd'] = new_wac_usd
-            
-        except Exception as e:
-            print(f"Error processing transaction at row {idx} for level {level}: {e}")
-            # Set default values to prevent cascade errors
-            df.at[idx, f'Transaction Cost USD ({level})'] = 0.0
-            df.at[idx, f'Transaction Cost CCY ({level})'] = 0.0
-            df.at[idx, f'Cumulative Quantity ({level})'] = security_state['cumulative_qty']
-            df.at[idx, f'Cumulative Cost CCY ({level})'] = security_state['cumulative_cost_ccy']
-            df.at[idx, f'Cumulative Cost USD ({level})'] = security_state['cumulative_cost_usd']
-            df.at[idx, f'Cost per Unit USD ({level})'] = security_state['wac_per_unit_usd']
-            df.at[idx, f'Cost per Unit CCY ({level})'] = security_state['wac_per_unit_ccy']
-            df.at[idx, f'Realized Gain/Loss CCY ({level})'] = 0.0
-            df.at[idx, f'Realized Gain/Loss USD ({level})'] = 0.0
+                keys = df[chrono_cols].reset_index(drop=True)
+                order = keys.sort_values(chrono_cols).index.to_numpy()
+            cache['order'] = order
+        return order
     
-    def get_holdings_snapshot(self, df: pd.DataFrame, as_of_date: str = None, level: str = "Portfolio") -> pd.DataFrame:
-        """Get holdings snapshot for a specific date and consolidation level"""
+    def get_holdings_snapshot(self, df: pd.DataFrame, as_of_date: str = None, level: str = "Portfolio",
+                              columns: List[str] = None) -> pd.DataFrame:
+        """Get holdings snapshot for a specific date and consolidation level, optionally projected to columns"""
+        # Rows in trade order; the order and group numbers are worked out on the whole frame
+        # once and reused for every date and level
+        order = self._chronological_order(df)
         if as_of_date:
-            # Filter transactions up to and including the specified date
+            # Keep transactions up to and including the specified date
             as_of_date = pd.to_datetime(as_of_date)
-            filtered_df = df[df['Trade date'] <= as_of_date].copy()
-        else:
-            # Use all transactions
-            filtered_df = df.copy()
+            in_range = (df['Trade date'] <= as_of_date).to_numpy()
+            order = order[in_range[order]]
         
-        if filtered_df.empty:
+        if len(order) == 0:
             return pd.DataFrame()
         
-        holdings_data = []
         group_cols = self.group_keys[level] + ['Security']
         
-        # Group by the consolidation keys plus security
-        grouped = filtered_df.groupby(group_cols, sort=False)
+        level_columns = self.level_columns[level]
+        qty_col = level_columns['Cumulative Quantity']
+        cost_usd_col = level_columns['Cumulative Cost USD']
+        cost_ccy_col = level_columns['Cumulative Cost CCY']
+        wac_usd_col = level_columns['Cost per Unit USD']
+        wac_ccy_col = level_columns['Cost per Unit CCY']
         
-        # For each group, get the last transaction's cumulative values
-        for group_key, group_df in grouped:
-            # Sort by date and get the last row for this security group
-            last_row = group_df.sort_values(['Trade date', 'Trade ID']).iloc[-1]
-            
-            qty_col = f'Cumulative Quantity ({level})'
-            cost_usd_col = f'Cumulative Cost USD ({level})'
-            cost_ccy_col = f'Cumulative Cost CCY ({level})'
-            wac_usd_col = f'Cost per Unit USD ({level})'
-            wac_ccy_col = f'Cost per Unit CCY ({level})'
-            
-            # Only include positions with non-zero quantity
-            current_qty = last_row[qty_col]
-            if abs(current_qty) > 0.001:  # Use small threshold to handle rounding
-                holding_record = {}
-                
-                # Add grouping fields
-                if level == "Portfolio":
-                    holding_record['Portfolio'] = last_row['Portfolio']
-                elif level == "Parent company":
-                    holding_record['Portfolio'] = last_row['Portfolio']
-                    holding_record['Parent company'] = last_row['Parent company']
-                elif level == "Legal entity":
-                    holding_record['Portfolio'] = last_row['Portfolio']
-                    holding_record['Parent company'] = last_row['Parent company']
-                    holding_record['Legal entity'] = last_row['Legal entity']
-                elif level == "Account":
-                    holding_record['Portfolio'] = last_row['Portfolio']
-                    holding_record['Parent company'] = last_row['Parent company']
-                    holding_record['Legal entity'] = last_row['Legal entity']
-                    holding_record['Custodian'] = last_row['Custodian']
-                    holding_record['Account'] = last_row['Account']
-                
-                # Add position details
-                holding_record.update({
-                    'Security': last_row['Security'],
-                    'Currency': last_row['Currency'],
-                    'Current Quantity': current_qty,
-                    'Current Cost USD': last_row[cost_usd_col],
-                    'Current Cost CCY': last_row[cost_ccy_col],
-                    'WAC per Unit USD': last_row[wac_usd_col],
-                    'WAC per Unit CCY': last_row[wac_ccy_col],
-                    'Last Trade Date': last_row['Trade date']
-                })
-                
-                holdings_data.append(holding_record)
+        # Last transaction of every group along the trade order: the first
+        # occurrence of each group number seen from the end. Rows with a blank key belong to
+        # no group, as with groupby.
+        group_ids = self._group_ids(df, level)[order]
+        order, group_ids = order[group_ids >= 0], group_ids[group_ids >= 0]
+        _, from_end = np.unique(group_ids[::-1], return_index=True)
+        last_positions = order[np.sort(len(order) - 1 - from_end)]
+        last_rows = df.take(last_positions)
+        
+        # Only include positions with non-zero quantity
+        last_rows = last_rows[last_rows[qty_col].abs() > 0.001]  # Use small threshold to handle rounding
+        if last_rows.empty:
+            return pd.DataFrame()
         
-        holdings_df = pd.DataFrame(holdings_data)
+        # Grouping fields and position details, taken as whole columns
+        holdings_df = pd.DataFrame({
+            **{col: last_rows[col] for col in group_cols},
+            'Currency': last_rows['Currency'],
+            'Current Quantity': last_rows[qty_col],
+            'Current Cost USD': last_rows[cost_usd_col],
+            'Current Cost CCY': last_rows[cost_ccy_col],
+            'WAC per Unit USD': last_rows[wac_usd_col],
+            'WAC per Unit CCY': last_rows[wac_ccy_col],
+            'Last Trade Date': last_rows['Trade date'],
+        })
         
         # Sort by portfolio, then security for better readability
-        if not holdings_df.empty:
-            sort_cols = ['Portfolio']
-            if level in ["Parent company", "Legal entity", "Account"]:
-                sort_cols.append('Parent company')
-            if level in ["Legal entity", "Account"]:
-                sort_cols.append('Legal entity')
-            if level == "Account":
-                sort_cols.extend(['Custodian', 'Account'])
-            sort_cols.append('Security')
-            
-            holdings_df = holdings_df.sort_values(sort_cols).reset_index(drop=True)
+        sort_cols = ['Portfolio']
+        if level in ["Parent company", "Legal entity", "Account"]:
+            sort_cols.append('Parent company')
+        if level in ["Legal entity", "Account"]:
+            sort_cols.append('Legal entity')
+        if level == "Account":
+            sort_cols.extend(['Custodian', 'Account'])
+        sort_cols.append('Security')
+        
+        holdings_df = holdings_df.sort_values(sort_cols).reset_index(drop=True)
         
-        return holdings_df 
\ No newline at end of file
+        if columns is not None:
+            holdings_df = holdings_df[[col for col in columns if col in holdings_df.columns]]
+        
+        return holdings_df 
+
+def process_transactions(df: pd.DataFrame) -> pd.DataFrame:
+    """Process transactions with a fresh processor (picklable entry point for worker processes)"""
+    return TransactionProcessor().process_transactions(df)